@@ -0,0 +1,201 @@
+# _autodoc_core.py
+#
+# The implementation of autodoc.py: parsing Easel-style function
+# headers out of a .c file and formatting them as Markdown. The
+# autodoc.py script is a thin entry point that calls main() here.
+#
+# All the regular expressions are compiled once, at import. The module
+# is type-annotated and mypy --strict clean, so it can optionally be
+# compiled to a C extension with mypyc:
+#    cd devkit; mypyc _autodoc_core.py
+# autodoc.py then picks up the compiled module automatically. Its
+# output is identical; nothing requires it.
+#
+
+import sys
+import re
+import getopt
+import mmap
+from typing import Dict, List, Tuple, Union
+
+# Regular expressions are compiled once, here, rather than on each call.
+#
+_PAT_PREFIX   = re.compile(r'^ \*[ \t]+(\S)',              flags=re.MULTILINE)               # leading " *   " on a header line
+_PAT_STAR     = re.compile(r'^ \*',                        flags=re.MULTILINE)               # " *" alone
+_PAT_ANGLE    = re.compile(r'<(\S|\S.*?\S)>',              flags=re.MULTILINE | re.DOTALL)   # <text>
+_PAT_ARG      = re.compile(r'^(\S+)\s*[:-]\s*(.+?)\s*$',    flags=re.MULTILINE)               # one row of an Args: table
+_PAT_FUNCTION = re.compile(r'/\*\s+Function:\s*(.+)$',     flags=re.MULTILINE)               # function name(s) in a header
+_PAT_SYNOPSIS = re.compile(r'^\s+\*\s+Synopsis:\s+(.+)$',  flags=re.MULTILINE)               # one-line synopsis, by itself, for -t
+_PAT_TYPELIST = re.compile(r'\{([DFILCWB]+)\}')                                               # "{DFI}" in "esl_foo_{DFI}Function()"
+_PAT_SECTION  = re.compile(r'^\s*\*#\s*(\d+\..+)')                                            # "*# 1. Section heading" in a comment
+_PAT_IMPL     = re.compile(r'^(?!#)(\S+.+?)\s+(\w+)\s*(\((?s:.+?)\))\s*\{', flags=re.MULTILINE)  # "type name(args) {" in an implementation
+
+# Fields in a function header, all collected in one pass. Synopsis is
+# a single line; the others are multiline, running until the end of the
+# comment or the start of the next field. Each field has its own named
+# group, so <m.lastgroup> says which one matched.
+_HEADER_FIELDS = ('Args', 'Purpose', 'Returns', 'Throws')
+_PAT_FIELDS    = re.compile(r'^\s+\*\s+(?:Synopsis:\s+(?P<Synopsis>[^\n]+)$|' +
+                            '|'.join(name + r':\s+(?P<' + name + r'>.+?)(?=^ \*/|^ \* \S)' for name in _HEADER_FIELDS) + ')',
+                            flags=re.MULTILINE | re.DOTALL)
+
+# The top-level scan runs directly on the memory-mapped .c file, so it's
+# a bytes pattern; only the spans it captures get decoded to str.
+#
+#                         /* Function:  ...    */   ... } to a blank line.   Grabs header + implementation(s)...
+#                         vv    vvvvvvvv       vv   vvv   vvv   v...      or, grabs subheading line in a comment
+_PAT_UNIT = re.compile(rb'^(/\*\s+Function:.+?^ \*/)(.+?^\})\s*$^\s*$|^\s*\*#\s*\d+\..+?$\s*', flags=re.MULTILINE | re.DOTALL)
+
+
+def process(text: str) -> str:
+    """
+    Remove the leading " *     " prefixes from a Purpose, Returns, or Throws
+    multiiline block of text that we've just pulled out of the function header.
+    
+    Convert <text> to `text` (Markdown code).
+    """
+    text = _PAT_PREFIX.sub(r'\1',   text)   # remove leading " *   "
+    text = _PAT_STAR.sub(  r'',     text)   # remove " *" alone
+    text = _PAT_ANGLE.sub( r'`\1`', text)   # convert <text> to `text`
+    return text
+
+def output_argtable(out: List[str], argtext: str) -> None:
+    """
+    Append a Markdown table of the arguments in an Args: block
+    to <out>, a list of output lines.
+    """
+    out.append("|  arg | description |")
+    out.append("|------|-------------|")
+    for m in _PAT_ARG.finditer(argtext):
+        name, desc = m.group(1, 2)
+        out.append(f"| `{name}` | {desc} |")
+    out.append("\n")
+
+def function_names(header: str) -> List[str]:
+    """
+    Return the list of function names on the "/* Function:" line of a
+    function <header>; usually one, but could also be a comma-delimited
+    list.
+    """
+    m = _PAT_FUNCTION.match(header)
+    assert m is not None               # always matches; <header> starts with "/* Function:"
+    return [ a.strip() for a in m.group(1).split(',') ]
+
+def _emit_table(out: List[str], u: 're.Match[bytes]') -> None:
+    """
+    For -t: append one row of the function summary table to <out>
+    for a documented function unit <u>. The table only uses the
+    function name and the Synopsis, so nothing else in the header or
+    the implementation is parsed. Section headings aren't shown.
+    """
+    if not u.group(0).startswith(b'/*'): return
+
+    header    = u.group(1).decode()
+    funcnames = function_names(header)
+    m         = _PAT_SYNOPSIS.search(header)
+    synopsis  = process(m.group(1)) if m else ''
+    out.append(f"| {'`' + funcnames[0] + '`':30s} | {synopsis:60s} |")
+
+def _emit_markdown(out: List[str], u: 're.Match[bytes]') -> None:
+    """
+    Append the full Markdown documentation for a documented function
+    unit <u> to <out>, or a subheading if <u> is a section heading.
+    """
+    if u.group(0).startswith(b'/*'):
+        header = u.group(1).decode()    # comment header "/* Function: ... */"
+        impl   = u.group(2).decode()    # implementation(s) "int myfunc(args){  }\nint func2(args){ }"
+
+        funcnames = function_names(header)
+
+        fields: Dict[str, str] = {}
+        for m in _PAT_FIELDS.finditer(header):
+            key = m.lastgroup                                      # name of the field that matched
+            assert key is not None
+            fields.setdefault(key, m.group(key))                   # first occurrence of a field wins
+
+        synopsis = process(fields['Synopsis']) if 'Synopsis' in fields else None
+        argtext  = process(fields['Args'])     if 'Args'     in fields else None
+        purpose  = process(fields['Purpose'])  if 'Purpose'  in fields else None
+        returns  = process(fields['Returns'])  if 'Returns'  in fields else None
+        throws   = process(fields['Throws'])   if 'Throws'   in fields else None
+
+        # pull the call syntax (function name, arguments) out of the C implementation;
+        # <syntax> is a list of each documented function and its call syntax, "int foo(double bar)".
+        # nontrivial to do well with just regexps, without a real grammar parser,
+        # because we're covering the less common case where there's >1 function
+        # documented by a single header.
+        impls: Dict[str, Tuple[str, str]] = {}                  # scan <impl> once for all "type name(args) {" definitions:
+        for m in _PAT_IMPL.finditer(impl):                      #   impls[name] = (type, args)
+            impls.setdefault(m.group(2), (m.group(1), m.group(3)))
+
+        syntax = []
+        for fname in funcnames:                                 # list of names like "esl_foo_Function()", with the (). Can also be esl_foo_{DFI}Function()", which needs expansion.
+            fname = fname.rstrip('()')                          # now just "esl_foo_Function" or "esl_foo_{DFI}Function()"
+            mt    = _PAT_TYPELIST.search(fname)                 # "esl_foo_{DFI}Function()" case?
+            if mt:                                              #   then expand it, one function name at a time
+                expanded = [ _PAT_TYPELIST.sub(c, fname) for c in mt.group(1) ]   # "DFI" for example
+            else:
+                expanded = [ fname ]
+            for efname in expanded:
+                if efname in impls: syntax.append(impls[efname][0] + ' ' + efname + impls[efname][1])
+                else:                                           # missed by the single scan? fall back to searching for this name alone
+                    mi = re.search(r'^(\S+.+?)\s+' + efname + r'\s*(\((?s:.+?)\))\s*\{', impl, flags=re.MULTILINE)
+                    if mi: syntax.append(mi.group(1) + ' ' + efname + mi.group(2))
+                    else:  exit(f"failed to parse out the syntax for {efname}")
+
+        # Now we're done parsing one (or more) documented functions,
+        # and it's time to print whatever we're going to print.
+        #
+        #   funcnames : list of one (or more) function names sharing the documentation
+        #   synopsis  : optional one-line description
+        #   syntax    : list of one (or more) "funcname(arg, arg)" call syntax
+        #   purpose   : optional documentation (Markdown format)
+        #   argtext   : optional argument table text (needs further processing)
+        #   returns:  : optional text about return status
+        #   throws:   : optional text about exceptions
+        #
+        for a in funcnames: out.append(f"### `{a}`\n")
+        if synopsis: out.append(f"**{synopsis.rstrip()}**\n") 
+        for s in syntax:    out.append(f"`{s}`\n")
+        if argtext: output_argtable(out, argtext)
+        if purpose: out.append(purpose)
+        if returns: out.append(f"Returns: {returns}")
+        if throws:  out.append(f"Throws: {throws}")
+        out.append("------")
+
+    else:  # or, we're a section heading.
+        ms = _PAT_SECTION.match(u.group(0).decode())
+        assert ms is not None
+        out.append(f"## {ms.group(1)}\n")
+
+def main() -> None:
+    try:    (opts, args) = getopt.getopt(sys.argv[1:], "t")
+    except:              sys.exit("Usage: autodoc.py [-t] <.c file>")
+    if (len(args) != 1): sys.exit("Usage: autodoc.py [-t] <.c file>")        
+
+    cfile    = args[0]
+    do_table = False
+    for opt, arg in opts:
+        if opt == '-t': do_table = True
+    
+    try:    fp = open(cfile, 'rb')
+    except (FileNotFoundError, IsADirectoryError): sys.exit(f".c file {cfile} not found")
+    text: Union[mmap.mmap, bytes]
+    with fp:     # the map holds its own dup of the file descriptor, so <fp> can be closed
+        try:               text = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError: text = b''    # mmap() refuses an empty file
+    if text.find(b'\r') != -1:       # CRLF (or CR) line endings: translate them, as a text-mode open() would,
+        text = text[:].replace(b'\r\n', b'\n').replace(b'\r', b'\n')   #   so the patterns' ^ and $ anchors still match
+    out: List[str] = []   # output lines, written all at once at the end
+
+    if do_table:
+        out.append(f"| {'Function':30s} | {'Synopsis':60s} |")
+        out.append(f"|{'':-^32s}|{'':-^62s}|")
+        emit = _emit_table
+    else:
+        emit = _emit_markdown
+
+    for u in _PAT_UNIT.finditer(text):
+        emit(out, u)
+
+    if out: sys.stdout.write('\n'.join(out) + '\n')
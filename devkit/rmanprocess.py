@@ -10,47 +10,96 @@
 import sys
 import re
 
-in_synopsis = False
+# Regular expressions are compiled once, here, rather than on each line.
+# Tests for a fixed prefix on a line use str.startswith() instead.
+#
+_RE_PROGDESC = re.compile(r'(\S+)\s*\\?-\s*(.+)$')
+_RE_BOLD     = re.compile(r'\\textbf\{')
+
+# Substitutions within a line, as (pattern, replacement) pairs.
+# The order of these replacements is important. (More specific ones first.)
+# They're applied in a single pass, as one alternation of named groups;
+# <m.lastgroup> says which one matched. Because the {-}{-} from a "--"
+# isn't rescanned, the \textit-- and \textbf-- cases get their own
+# entries.
+_SUBS = [
+    (r'\\begin\{itemize\}',  r'\begin{wideitem}'),
+    (r'\\end\{itemize\}',    r'\end{wideitem}'),
+    (r'\\section\{',         r'\subsection*{'),      # \subsection* suppresses inclusion in TOC
+    (r'--',                  r'{-}{-}'),
+    (r'\\item\s*\[\\textbf', r'\item [\monob'),      # option names in .TP are emphasized bold
+    (r'\\textbf\{\\% ',      r'\user{\% '),          # example command lines are bold, on their own line
+    (r'\\textit--',          r'\monoi{-}{-}'),
+    (r'\\textit\{',          r'\monoi{'),            # metavariables (options, args) are .I in man, mono italic in tex
+    (r'\\textbf--',          r'\mono{-}{-}'),
+    (r'\\textbf\{',          r'\mono{'),             # literals (commands, etc) are .B in man, normal mono in tex
+    ]
+_RE_SUBS  = re.compile('|'.join(f'(?P<s{i}>{pat})' for i, (pat, _) in enumerate(_SUBS)))
+_SUB_REPL = { f's{i}': repl for i, (_, repl) in enumerate(_SUBS) }
+
+def _subrepl(m):
+    return _SUB_REPL[m.lastgroup]
+
+def _write(out):
+    # Write output lines <out> in one go, as UTF-8 bytes straight to
+    # the stdout buffer, bypassing the text layer.
+    if out: sys.stdout.buffer.write(('\n'.join(out) + '\n').encode('utf-8'))
+
+def _find_synopsis_range(lines):
+    # Return (start, end) such that lines[start:end] is the Synopsis
+    # section, from its \section{Synopsis} line up to the next \section{.
+    # (0, 0) if there's no Synopsis section.
+    for start, line in enumerate(lines):
+        if line.startswith(r'\section{Synopsis}'):
+            for end in range(start+1, len(lines)):
+                if lines[end].startswith(r'\section{'):
+                    return start, end
+            return start, len(lines)
+    return 0, 0
+
+out = []     # output lines, written all at once at the end
 
 if len(sys.argv) == 1:
     f = sys.stdin
 else:
     f = open(sys.argv[1])
+lines = [ line.rstrip('\n') for line in f ]
+if f != sys.stdin:
+    f.close()
 
-for line in f:
-    line = line.rstrip('\n')
-    
-    # State flags (where are we in the document)
-    if re.match(r'\\section{Synopsis}', line):
-        in_synopsis = True
-    elif re.match(r'\\section{', line):
-        in_synopsis = False
+# First pass: where are we in the document? Second pass (below) processes each line.
+syn_start, syn_end = _find_synopsis_range(lines)
+
+it = iter(enumerate(lines))
+for i, line in it:
+    in_synopsis = syn_start <= i < syn_end
 
     #
     # Linewise substitutions: replace certain entire lines with something else.
     #
     # Remove \documentclass, and changes to \parindent and \parskip
-    if re.match(r'\\documentclass',          line): continue
-    if re.match(r'\\setlength{\\parindent}', line): continue
-    if re.match(r'\\setlength{\\parskip}',   line): continue
-    if re.match(r'\\begin\{document\}',      line): continue
+    if line.startswith(r'\documentclass'):         continue
+    if line.startswith(r'\setlength{\parindent}'): continue
+    if line.startswith(r'\setlength{\parskip}'):   continue
+    if line.startswith(r'\begin{document}'):       continue
 
     # Replace \section{Name} with \section{progname - description}, using next line too.
-    if re.match(r'\\section\{Name\}', line):
-        for line in f:
-            if not re.fullmatch(r'\s*', line):
+    if line.startswith(r'\section{Name}'):
+        for i, line in it:
+            if line.strip():
                 break
-        m = re.match(r'(\S+)\s*\\?-\s*(.+)$', line)
+        m = _RE_PROGDESC.match(line)
         if m:
-            print(r'\section{{\texorpdfstring{{\monob{{{0}}}}}{{{0}}} - {1}}}'.format(m.group(1), m.group(2)))
+            out.append(r'\section{{\texorpdfstring{{\monob{{{0}}}}}{{{0}}} - {1}}}'.format(m.group(1), m.group(2)))
         else:
-            print("Error: no progname/description line found");
+            out.append("Error: no progname/description line found")
+            _write(out)
             sys.exit(1)
         continue
 
     # Remove everything after \section{See Also), and finish.
-    if re.match(r'\\section\{See', line) or re.match(r'\\end\{document', line):
-        print("\\newpage");
+    if line.startswith((r'\section{See', r'\end{document')):
+        out.append("\\newpage")
         break
 
 
@@ -60,27 +109,21 @@ for line in f:
     #
 
     # In synopsis, put \noindent in front of each commandline, and preserve the .B's as bold.
-    if in_synopsis and re.match(r'\s*\\textbf{', line):
-        line = re.sub(r'\\textbf\{', r'\\monob{', line)
-        print("\\noindent")
+    if in_synopsis and line.lstrip().startswith(r'\textbf{'):
+        line = _RE_BOLD.sub(r'\\monob{', line)
+        out.append("\\noindent")
 
     #
-    # Substitutions within a line.
-    # The order of these replacements is important. (More specific ones first.)
+    # Substitutions within a line (see _SUBS above).
+    # Every pattern but -- starts with a backslash, so a line with
+    # neither can skip the regex engine entirely.
     #
-    line = re.sub(r'\\begin\{itemize\}',  r'\\begin{wideitem}', line)
-    line = re.sub(r'\\end\{itemize\}',    r'\\end{wideitem}',   line)
-    line = re.sub(r'\\section\{',         r'\\subsection*{',    line)   # \subsection* suppresses inclusion in TOC
-    line = re.sub(r'--',                  r'{-}{-}',            line)
-    line = re.sub(r'\\item\s*\[\\textbf', r'\\item [\\monob',   line)   # option names in .TP are emphasized bold
-    line = re.sub(r'\\textbf\{\\% ',      r'\\user{\\% ',       line)   # example command lines are bold, on their own line
-    line = re.sub(r'\\textit\{',          r'\\monoi{',          line)   # metavariables (options, args) are .I in man, mono italic in tex
-    line = re.sub(r'\\textbf\{',          r'\\mono{',           line)   # literals (commands, etc) are .B in man, normal mono in tex
-
-    print(line)
+    if '\\' in line or '--' in line:
+        line = _RE_SUBS.sub(_subrepl, line)
+
+    out.append(line)
     
 
 
-if f != sys.stdin:
-    f.close()
+_write(out)
 
@@ -43,6 +43,12 @@
 
 import sys
 import re
+from collections import defaultdict
+
+_SKIP = frozenset({ b'\\', b'esl_config.h' })  # depfile tokens that aren't module dependencies
+_HEAD = re.compile(rb'([^\s:]+):\s*(.*)')         # "esl_foo.o: <deps>": module, and its list of dependencies
+_CONT = re.compile(rb'\\(?:\r\n?|\n)')            # "\" continuation at end of line, with LF, CRLF, or CR line ending
+_fmt  = '{:20s}: '.format                         # start of an output_direct_deplines() line: "module              : "
 
 
 easelgrps = [
@@ -92,106 +98,108 @@ easelparents = {
     'MPI':                        { 'BENCHMARKS', 'SEQUENCE_FILES' }
     }
     
+_EMPTY = frozenset()   # shared by every module with no additional dependencies
+
 easeladd = {
 # BASE
-    'easel'             : set(),
-    'mem'               : { 'easel' },
-    'random'            : { 'easel' },
-    'regexp'            : { 'easel' },
-    'stack'             : { 'easel', 'random' },
-    'vectorops'         : { 'easel', 'random' },
+    'easel'             : _EMPTY,
+    'mem'               : frozenset({ 'easel' }),
+    'random'            : frozenset({ 'easel' }),
+    'regexp'            : frozenset({ 'easel' }),
+    'stack'             : frozenset({ 'easel', 'random' }),
+    'vectorops'         : frozenset({ 'easel', 'random' }),
 # ALGORITHMS
-    'arr2'              : set(),
-    'arr3'              : set(),
-    'bitfield'          : set(),
-    'cluster'           : set(),
-    'dmatrix'           : set(),
-    'heap'              : set(),
-    'keyhash'           : set(),
-    'matrixops'         : set(),
-    'quicksort'         : set(),
-    'red_black'         : set(),
-    'varint'            : set(),
-    'huffman'           : { 'quicksort' },
-    'graph'             : { 'matrixops' },
-    'tree'              : { 'arr2', 'dmatrix', 'stack'},
+    'arr2'              : _EMPTY,
+    'arr3'              : _EMPTY,
+    'bitfield'          : _EMPTY,
+    'cluster'           : _EMPTY,
+    'dmatrix'           : _EMPTY,
+    'heap'              : _EMPTY,
+    'keyhash'           : _EMPTY,
+    'matrixops'         : _EMPTY,
+    'quicksort'         : _EMPTY,
+    'red_black'         : _EMPTY,
+    'varint'            : _EMPTY,
+    'huffman'           : frozenset({ 'quicksort' }),
+    'graph'             : frozenset({ 'matrixops' }),
+    'tree'              : frozenset({ 'arr2', 'dmatrix', 'stack'}),
 # NUMERICAL_METHODS
-    'rootfinder'        : set(),
-    'minimizer'         : set(),
-    'rand64'            : set(),
+    'rootfinder'        : _EMPTY,
+    'minimizer'         : _EMPTY,
+    'rand64'            : _EMPTY,
 # BIOLOGICAL_SEQUENCES
-    'alphabet'          : set(),
-    'composition'       : set(),
-    'hmm'               : { 'alphabet' },
+    'alphabet'          : _EMPTY,
+    'composition'       : _EMPTY,
+    'hmm'               : frozenset({ 'alphabet' }),
 # FILE_INPUT
-    'buffer'            : set(),
-    'fileparser'        : set(),
-    'recorder'          : set(),
-    'ssi'               : set(),
-    'json'              : { 'buffer' },
+    'buffer'            : _EMPTY,
+    'fileparser'        : _EMPTY,
+    'recorder'          : _EMPTY,
+    'ssi'               : _EMPTY,
+    'json'              : frozenset({ 'buffer' }),
 # COMMANDLINE
-    'getopts'           : set(),
-    'subcmd'            : { 'getopts' },
+    'getopts'           : _EMPTY,
+    'subcmd'            : frozenset({ 'getopts' }),
 # BENCHMARKS
-    'stopwatch'         : set(),
+    'stopwatch'         : _EMPTY,
 # STATISTICAL_DISTRIBUTIONS
-    'stats'             : set(),
-    'normal'            : { 'stats' },
-    'histogram'         : { 'stats' },
-    'exponential'       : { 'stats', 'histogram' },
-    'gamma'             : { 'stats', 'histogram' },
-    'gev'               : { 'stats' },
-    'gumbel'            : { 'stats' },
-    'stretchexp'        : { 'stats', 'histogram' },
-    'weibull'           : { 'stats', 'histogram' },
+    'stats'             : _EMPTY,
+    'normal'            : frozenset({ 'stats' }),
+    'histogram'         : frozenset({ 'stats' }),
+    'exponential'       : frozenset({ 'stats', 'histogram' }),
+    'gamma'             : frozenset({ 'stats', 'histogram' }),
+    'gev'               : frozenset({ 'stats' }),
+    'gumbel'            : frozenset({ 'stats' }),
+    'stretchexp'        : frozenset({ 'stats', 'histogram' }),
+    'weibull'           : frozenset({ 'stats', 'histogram' }),
 # MIXTURE_DISTRIBUTIONS
-    'dirichlet'         : set(),
-    'hyperexp'          : set(),
-    'mixdchlet'         : { 'dirichlet' },
-    'mixgev'            : { 'dirichlet' },
+    'dirichlet'         : _EMPTY,
+    'hyperexp'          : _EMPTY,
+    'mixdchlet'         : frozenset({ 'dirichlet' }),
+    'mixgev'            : frozenset({ 'dirichlet' }),
 # ADVANCED_SEQUENCES
-    'distance'          : set(),
-    'wuss'              : set(),
-    'paml'              : set(),
-    'randomseq'         : set(),
-    'ratematrix'        : set(),
-    'scorematrix'       : { 'ratematrix'  },
-    'swat'              : { 'scorematrix' },       
+    'distance'          : _EMPTY,
+    'wuss'              : _EMPTY,
+    'paml'              : _EMPTY,
+    'randomseq'         : _EMPTY,
+    'ratematrix'        : _EMPTY,
+    'scorematrix'       : frozenset({ 'ratematrix'  }),
+    'swat'              : frozenset({ 'scorematrix' }),       
 # MULTIPLE_ALIGNMENTS
-    'msa'               : set(),
-    'msacluster'        : { 'msa' },
-    'msashuffle'        : { 'msa' },
-    'msaweight'         : { 'msa', 'msacluster' },
+    'msa'               : _EMPTY,
+    'msacluster'        : frozenset({ 'msa' }),
+    'msashuffle'        : frozenset({ 'msa' }),
+    'msaweight'         : frozenset({ 'msa', 'msacluster' }),
 # MULTIPLE_ALIGNMENT_FILES
-    'msafile'           : set(),
-    'msafile2'          : set(),
-    'msafile_a2m'       : { 'msafile' },
-    'msafile_afa'       : { 'msafile' },
-    'msafile_clustal'   : { 'msafile' },
-    'msafile_phylip'    : { 'msafile' },
-    'msafile_psiblast'  : { 'msafile' },
-    'msafile_selex'     : { 'msafile' },
-    'msafile_stockholm' : { 'msafile' },
+    'msafile'           : _EMPTY,
+    'msafile2'          : _EMPTY,
+    'msafile_a2m'       : frozenset({ 'msafile' }),
+    'msafile_afa'       : frozenset({ 'msafile' }),
+    'msafile_clustal'   : frozenset({ 'msafile' }),
+    'msafile_phylip'    : frozenset({ 'msafile' }),
+    'msafile_psiblast'  : frozenset({ 'msafile' }),
+    'msafile_selex'     : frozenset({ 'msafile' }),
+    'msafile_stockholm' : frozenset({ 'msafile' }),
 # SEQUENCE_FILES
-    'sq'                : set(),
-    'sqio'              : { 'sq' },
-    'sqio_ascii'        : { 'sq', 'sqio' },
-    'sqio_ncbi'         : { 'sq', 'sqio' },
-    'dsqdata'           : { 'sq', 'sqio', 'sqio_ascii' },
-    'gencode'           : { 'sq', 'sqio', 'sqio_ascii', 'sqio_ncbi' },
+    'sq'                : _EMPTY,
+    'sqio'              : frozenset({ 'sq' }),
+    'sqio_ascii'        : frozenset({ 'sq', 'sqio' }),
+    'sqio_ncbi'         : frozenset({ 'sq', 'sqio' }),
+    'dsqdata'           : frozenset({ 'sq', 'sqio', 'sqio_ascii' }),
+    'gencode'           : frozenset({ 'sq', 'sqio', 'sqio_ascii', 'sqio_ncbi' }),
 # SIMD_VECTORS
-    'alloc'             : set(),
-    'cpu'               : set(),
-    'sse'               : set(),
-    'avx'               : set(),
-    'avx512'            : set(),
-    'neon'              : set(),
-    'vmx'               : set(),
+    'alloc'             : _EMPTY,
+    'cpu'               : _EMPTY,
+    'sse'               : _EMPTY,
+    'avx'               : _EMPTY,
+    'avx512'            : _EMPTY,
+    'neon'              : _EMPTY,
+    'vmx'               : _EMPTY,
 # MULTITHREADING
-    'threads'           : set(),
-    'workqueue'         : set(),
+    'threads'           : _EMPTY,
+    'workqueue'         : _EMPTY,
 # MPI
-    'mpi'               : set(),
+    'mpi'               : _EMPTY,
     }
 
 
@@ -200,40 +208,44 @@ def main():
     if (len(sys.argv) != 2):
         sys.exit("Usage: techtree.py <.dep file>");
 
-    validate_layout()
-    Ma = expand_layout()   # Ma[m] is a set of allowable dependencies for module <m>, according to layout
+    MID = validate_layout()   # MID[m] is an integer id for module <m>, in layout order
+    Ma  = expand_layout(MID)  # Ma[MID[m]] is a bitmask of allowable dependencies for module <m>, according to layout
 
     # Get the actual dependencies from the input file.
     # <D[m]> is a set of module dependencies for module <m>
     #  excluding esl_config.h and itself, as parsed out of input
     #  depfile. 
     #
-    D = {}
-    for line in open(sys.argv[1]):
-        mat = re.match(r'(\S+): (.+)', line)  # First line in a list of dependencies?
-        if mat:
-            m  = process_token(mat.group(1))
-            fields = mat.group(2).split()
-            D[m] = set();
-        else:
-            fields   = line.split()
+    # The depfile is read in one go, as bytes, and continuation lines
+    # are joined up front, so each line is one complete list. Any line
+    # ending (LF, CRLF, CR) is accepted, as a text-mode open() would.
+    #
+    with open(sys.argv[1], 'rb') as f:
+        data = _CONT.sub(b' ', f.read())
 
-        for s in fields:
-            if s != "\\" and s != 'esl_config.h':   # ignore \ and esl_config.h...
-                s = process_token(s)                # ... extract module name from filename
-                if s != m:                          # ... and ignore dependencies on itself
-                    D[m].add(s)                     # ... otherwise, add dependencies to the set.
+    D = defaultdict(set)
+    for line in data.splitlines():
+        mat = _HEAD.match(line)   # "esl_foo.o: esl_foo.c esl_config.h easel.h ..."
+        if not mat: continue
+        m = process_token(mat.group(1))
+        D[m].update(s for s in (process_token(t)                  # extract module name from filename,
+                                for t in mat.group(2).split()
+                                if t not in _SKIP)                # ignoring \ and esl_config.h,
+                    if s != m)                                    # and dependencies on itself.
+    D.default_factory = None   # done parsing: a module missing from the depfile is a KeyError, not an empty set
         
-    output_direct_deplines(D)  # First section: actual dependencies, organized for study.
-    compare_layout(Ma, D)      # Followed by any problems in them.
+    output_direct_deplines(D, MID)  # First section: actual dependencies, organized for study.
+    compare_layout(Ma, D, MID)      # Followed by any problems in them.
 
 
 def process_token(tok):
     """
+    Return the module name for a filename <tok> from the depfile, as a str:
+    b"esl_msa.h" => "msa", b"easel.o" => "easel".
     """
-    tok = re.sub(r'^esl_',   '', tok)
-    tok = re.sub(r'.[coh]$', '', tok)
-    return tok
+    if tok.startswith(b'esl_'):             tok = tok[4:]
+    if tok.endswith((b'.c', b'.o', b'.h')): tok = tok[:-2]
+    return tok.decode()
 ####
 
 
@@ -242,26 +254,29 @@ def process_token(tok):
 # Checks the four global data structures that define the figure
 # layout.
 #
+# Return <MID>, a dict: MID[m] is an integer id for module <m>,
+# numbering modules in layout order (groups in <easelgrps> order,
+# modules in <easelmods> order). Bit MID[m] stands for module <m> in
+# the dependency bitmasks from expand_layout().
+#
 def validate_layout():
-    Gl = set(easelgrps)             # <easelgrps> list is all the group names
-    Gm = set(easelmods.keys())      # <easelmods> keys are also all the group names
-    Gp = set(easelparents.keys())   # <easelparents> keys are also all the group names
-    if Gl != Gm: sys.exit("easelgrps and easelmods have different set of group names")
-    if Gl != Gp: sys.exit("easelgrps and easelparents have different set of group names")
+    Gl = set(easelgrps)             # <easelgrps> list is all the group names; so are the keys of <easelmods>, <easelparents>
+    if easelmods.keys()    ^ Gl: sys.exit("easelgrps and easelmods have different set of group names")
+    if easelparents.keys() ^ Gl: sys.exit("easelgrps and easelparents have different set of group names")
+    if any(len(scc) > 1 or scc[0] in easelparents[scc[0]] for scc in group_sccs()):
+        sys.exit("easelparents must not have a cycle")
     
-    Mm = []            # Get all the module names in <easelmods>'s sets.
-    for g in easelmods.keys():
+    MID = {}           # Get all the module names in <easelmods>'s lists, checking each is only in one group.
+    for g in easelgrps:
         for m in easelmods[g]:
-           Mm.append(m)
-    if len(Mm) != len(set(Mm)):
-        sys.exit("easelmods must have same module assigned to >1 group")
-    Mm = set(Mm)
-    Ma = set(easeladd.keys())
-    if Mm != Ma:
+            if m in MID: sys.exit("easelmods has module {0} assigned to >1 group".format(m))
+            MID[m] = len(MID)
+    if easeladd.keys() ^ MID.keys():
         sys.exit("easelmods and easeladd have a different set of module names")
 
-    print("# {0} groups".format(len(Gm)))
-    print("# {0} modules".format(len(Mm)))
+    print("# {0} groups".format(len(Gl)))
+    print("# {0} modules".format(len(MID)))
+    return MID
 ####
 
 
@@ -272,51 +287,143 @@ def validate_layout():
 # set of dependencies for it. Use that to obtain its complete set of
 # module dependencies.
 #
-# Return a <Ma>, a dict of sets: Ma[m] is a set of modules that module
-# <m> depends on.
+# Return a <Ma>, a list of int bitmasks indexed by module id:
+# Ma[MID[m]] has bit MID[m2] set if module <m> may depend on module <m2>.
 #
-def expand_layout():
-    # Use a pushdown automaton to recursively find all group dependencies
-    # for each group <g>; store this set in Ga[g].
+def expand_layout(MID):
+    # Strongly connected components come out of group_sccs() with every
+    # SCC after the ones it depends on, so the complete set of group
+    # dependencies for an SCC is its members' parents, plus the already
+    # computed sets of parents outside it. All members of an SCC share
+    # one set. The layout is a DAG, so SCCs are single groups (and a
+    # group isn't its own parent); a cycle would still come out right,
+    # with each member depending on all of them.
     Ga = {}
-    for g in easelparents.keys():
-        Ga[g] = set()
-        pda = list(easelparents[g])
-        while len(pda):
-            g2 = pda.pop()
-            Ga[g].add(g2)
-            pda.extend(list(easelparents[g2]))
+    for scc in group_sccs():
+        closure = set()
+        for g in scc:
+            closure.update(easelparents[g])
+            for g2 in easelparents[g]:
+                if g2 in Ga: closure |= Ga[g2]    # not yet in Ga: <g2> is in this SCC
+        for g in scc:
+            Ga[g] = closure
 
-    # Using Ga, plus additional within-group module dependencies in <adds>,
-    # expand set of group dependencies to set of module dependencies for each module <m>.
-    Ma = {}
+    # Using Ga, plus additional within-group module dependencies in <easeladd>,
+    # expand set of group dependencies to a bitmask of module dependencies for each module <m>.
+    # Each group's module list is converted to a bitmask only once.
+    MODS_BITS = { g: module_bits(ms, MID) for g, ms in easelmods.items() }
+    Ma = [ 0 ] * len(MID)
     for g in easelmods.keys():
-        mdep = set()
+        mdep = 0
         for g2 in Ga[g]:                       # for each group that <g> depends on...
-            mdep = mdep | set(easelmods[g2])   #   add the modules in that group
+            mdep |= MODS_BITS[g2]              #   add the modules in that group
         for m in easelmods[g]:
-            Ma[m] = mdep | easeladd[m]
+            Ma[MID[m]] = mdep | module_bits(easeladd[m], MID)
     return Ma
 ####
+
+
+def module_bits(ms, MID):
+    """
+    Return the bitmask for an iterable of module names <ms>:
+    bit MID[m] is set for each module <m>.
+    """
+    bits = 0
+    for m in ms:
+        bits |= 1 << MID[m]
+    return bits
+
+def module_names(bits, MODS):
+    """
+    Return the set of module names for bitmask <bits>, where
+    MODS[i] is the name of the module with id <i>.
+    """
+    names = set()
+    while bits:
+        low   = bits & -bits              # lowest set bit
+        names.add(MODS[low.bit_length() - 1])
+        bits ^= low
+    return names
+####
+
+
+# group_sccs()
+#
+# Find the strongly connected components of the group dependency graph
+# (g -> easelparents[g]), by Tarjan's algorithm, done iteratively.
+#
+# Return a list of SCCs, each a list of group names, in reverse
+# topological order: each SCC comes after every SCC that it depends on.
+#
+def group_sccs():
+    index   = {}        # index[g]: order in which <g> was first visited
+    low     = {}        # low[g]:   lowest index reachable from <g> within the DFS stack
+    stack   = []        # groups visited but not yet assigned to an SCC
+    onstack = set()
+    sccs    = []
+    for root in easelparents:
+        if root in index: continue
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        onstack.add(root)
+        work = [ (root, iter(easelparents[root])) ]
+        while work:
+            g, parents = work[-1]
+            for g2 in parents:
+                if g2 not in index:                    # descend into <g2>; resume <g> later
+                    index[g2] = low[g2] = len(index)
+                    stack.append(g2)
+                    onstack.add(g2)
+                    work.append( (g2, iter(easelparents[g2])) )
+                    break
+                elif g2 in onstack:
+                    low[g] = min(low[g], index[g2])
+            else:                                      # done with <g>
+                work.pop()
+                if work: low[work[-1][0]] = min(low[work[-1][0]], low[g])
+                if low[g] == index[g]:                 # <g> is the root of an SCC
+                    scc = []
+                    while True:
+                        g2 = stack.pop()
+                        onstack.discard(g2)
+                        scc.append(g2)
+                        if g2 == g: break
+                    sccs.append(scc)
+    return sccs
+####
     
 
-def compare_layout(Ma, D):
-    for m in Ma.keys():
-        if not Ma[m] >= D[m]:
-            print(m, D[m] - Ma[m])
+def compare_layout(Ma, D, MID):
+    # Iterating over the actual dependencies <D> means a module that's
+    # missing from the layout fails (KeyError) instead of being skipped.
+    # Dependencies on modules in the layout are compared as bitmasks;
+    # any others (headers that aren't modules) are never allowed.
+    MODS = list(MID)                  # MODS[i] is the name of module id <i>
+    for m, deps in D.items():
+        i     = MID[m]
+        bits  = 0
+        other = set()
+        for m2 in deps:
+            if m2 in MID: bits |= 1 << MID[m2]
+            else:         other.add(m2)
+        extra = bits & ~Ma[i]
+        if extra or other: print(m, other | module_names(extra, MODS))
 
-def output_direct_deplines(D):
+def output_direct_deplines(D, MID):
+    # Module ids <MID> are in layout order (groups in <easelgrps> order,
+    # modules in <easelmods> order); each module's dependencies are
+    # listed in that order. Dependencies that aren't in the layout
+    # (other headers) aren't shown.
     for g in easelgrps:
-        print('# {0}'.format(g))
+        sys.stdout.write('# {0}\n'.format(g))
         for m in easelmods[g]:
-            print('{0:20s}: '.format(m), end='')
-
-            for g2 in easelgrps:
-                for m2 in easelmods[g2]:
-                    if m2 in D[m]:
-                        print('{0} '.format(m2), end='')
-            print('')
-    print('')
+            buf = [ _fmt(m) ]
+            for m2 in sorted((m2 for m2 in D[m] if m2 in MID), key=MID.__getitem__):
+                buf.append(m2)
+                buf.append(' ')
+            buf.append('\n')
+            sys.stdout.write(''.join(buf))
+    sys.stdout.write('\n')
 
 if __name__ == "__main__":
     main()
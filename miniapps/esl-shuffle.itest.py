@@ -19,84 +19,88 @@ builddir = sys.argv[1]
 srcdir   = sys.argv[2]
 tmppfx   = sys.argv[3]
 
-if not os.path.isfile('{0}/miniapps/esl-shuffle'.format(builddir)):
+# Paths and arguments that every test uses are built once, here.
+#
+ESL_SHUFFLE = os.path.join(builddir, 'miniapps', 'esl-shuffle')
+STOFILE     = tmppfx + '.sto'
+FAFILE      = tmppfx + '.fa'
+SEED        = ( '--seed', '42' )
+
+if not os.path.isfile(ESL_SHUFFLE):
     sys.exit('FAIL: no esl-shuffle program in {0}'.format(builddir))
 errmsg = 'FAIL: esl-shuffle.itest.py integration test failed'
 
 
 # <tmppfx>.sto is a test alignment file
 #
-with open('{0}.sto'.format(tmppfx), 'w') as f:    
-    print(
-"""# STOCKHOLM 1.0
-
-seq1 ACDEFGHIKLMNPQRSTVWY
-seq2 ACDEFGHIKLMNPQRSTVWY
-seq3 ACDEFGHIKLMNPQRSTVWY
-seq4 ACDEFGHIKLMNPQRSTVWY
-seq5 ACDEFGHIKLMNPQRSTVWY
-//
-""", end='', file=f)
-
-# <tmppfx>.fa is a test sequence file    
-with open('{0}.fa'.format(tmppfx), 'w') as f:
-    print(
-""">seq1
-ACDEFGHIKLMNPQRSTVWY
->seq2
-ACACACACACACACACACAC
->seq3
-WYWYWYWYWYWYWYWYWYWY
-""", end='', file=f)
+STO = (b'# STOCKHOLM 1.0\n'
+       b'\n'
+       b'seq1 ACDEFGHIKLMNPQRSTVWY\n'
+       b'seq2 ACDEFGHIKLMNPQRSTVWY\n'
+       b'seq3 ACDEFGHIKLMNPQRSTVWY\n'
+       b'seq4 ACDEFGHIKLMNPQRSTVWY\n'
+       b'seq5 ACDEFGHIKLMNPQRSTVWY\n'
+       b'//\n')
+
+# <tmppfx>.fa is a test sequence file
+#
+FA  = (b'>seq1\n'
+       b'ACDEFGHIKLMNPQRSTVWY\n'
+       b'>seq2\n'
+       b'ACACACACACACACACACAC\n'
+       b'>seq3\n'
+       b'WYWYWYWYWYWYWYWYWYWY\n')
+
+with open(STOFILE, 'wb') as f: f.write(STO)
+with open(FAFILE,  'wb') as f: f.write(FA)
 
 
+# Each test is (args, number of output lines, {line index: expected line}).
+# The tests are independent, so all three esl-shuffle runs are
+# started at once and then checked in turn.
+#
 # Use of --seed makes shuffled outputs reproducible, regressable.
 # Until you change the RNG again, anyway. If you do that, all these
 # regressions need to change.
 #
-try:
-    output = subprocess.check_output([ '{}/miniapps/esl-shuffle'.format(builddir), '--seed', '42', '{}.fa'.format(tmppfx) ],
-                                     stderr=subprocess.STDOUT, universal_newlines=True)
-except:
-    sys.exit(errmsg)
+tests = [
+    ( [ FAFILE ], 6,
+      { 0: '>seq1-shuffled',
+        1: 'TIGEYHFWCKVSALQNPDRM',
+        2: '>seq2-shuffled',
+        3: 'CACAAAACCCACCAACAACC',
+        4: '>seq3-shuffled',
+        5: 'WWYYWWYWWYYWYYWYYWYW' } ),
+
+    # We had bugs in the -N option at one point.  This test exercises the
+    # bugs.
+    ( [ '-N', '2', FAFILE ], 12,
+      { 2: '>seq1-shuffled-1',
+        3: 'NTEPDRFIQYKLCMWVHAGS' } ),
+
+    # Easel iss #24 was a silly, untested failure of esl-shuffle -A
+    ( [ '-A', STOFILE ], 9,
+      { 3: 'seq1 TIGEYHFWCKVSALQNPDRM' } ),
+    ]
 
-lines = output.splitlines()
-if len(lines) != 6:                         sys.exit(errmsg)
-if (lines[0] != '>seq1-shuffled'        or
-    lines[1] != 'TIGEYHFWCKVSALQNPDRM'  or
-    lines[2] != '>seq2-shuffled'        or
-    lines[3] != 'CACAAAACCCACCAACAACC'  or
-    lines[4] != '>seq3-shuffled'        or
-    lines[5] != 'WWYYWWYWWYYWYYWYYWYW'):    sys.exit(errmsg)
-
-# We had bugs in the -N option at one point.  This test exercises the
-# bugs.
-#
 try:
-    output = subprocess.check_output([ '{}/miniapps/esl-shuffle'.format(builddir), '--seed', '42', '-N', '2', '{}.fa'.format(tmppfx) ],
-                                     stderr=subprocess.STDOUT, universal_newlines=True)
+    procs = [ subprocess.Popen([ ESL_SHUFFLE, *SEED, *args ],
+                               stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+              for args, _, _ in tests ]
 except:
     sys.exit(errmsg)
-    
-lines = output.splitlines()
-if len(lines) != 12:                     sys.exit(errmsg)
-if (lines[2] != '>seq1-shuffled-1'  or
-    lines[3] != 'NTEPDRFIQYKLCMWVHAGS'): sys.exit(errmsg);
 
-# Easel iss #24 was a silly, untested failure of esl-shuffle -A
-#
-try:
-    output = subprocess.check_output([ '{}/miniapps/esl-shuffle'.format(builddir), '--seed', '42', '-A', '{}.sto'.format(tmppfx) ],
-                                     stderr=subprocess.STDOUT, universal_newlines=True)
-except:
-    sys.exit(errmsg)
+for proc, (args, nlines, expected) in zip(procs, tests):
+    output = proc.communicate()[0]
+    if proc.returncode != 0: sys.exit(errmsg)
 
-lines = output.splitlines()
-if len(lines) != 9:                           sys.exit(errmsg)
-if (lines[3] != 'seq1 TIGEYHFWCKVSALQNPDRM'): sys.exit(errmsg)
+    lines = output.splitlines()
+    if len(lines) != nlines: sys.exit(errmsg)
+    for i, line in expected.items():
+        if lines[i] != line: sys.exit(errmsg)
 
 print('ok')
 
-os.remove('{0}.sto'.format(tmppfx))
-os.remove('{0}.fa'.format(tmppfx))
+os.remove(STOFILE)
+os.remove(FAFILE)
 sys.exit(0)